@@ -1,9 +1,50 @@
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import List, Dict, Any, Optional
+import logging
+from functools import lru_cache
+from psycopg.rows import dict_row, tuple_row
+from psycopg_pool import AsyncConnectionPool
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from datetime import datetime
 
+COLUMN_EXPRESSIONS = {
+    'timestamp': "to_char(timestamp, 'YYYY-MM-DD\"T\"HH24:MI:SS') AS timestamp",
+    'wind_speed': 'wind_speed',
+    'power': 'power',
+    'ambient_temprature': 'ambient_temprature'
+}
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIABLES = ('timestamp', 'wind_speed', 'power', 'ambient_temprature')
+
+DATA_COUNT_ESTIMATE_QUERY = "SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = 'data'::regclass"
+
+@lru_cache(maxsize=128)
+def build_data_query(
+    variables: Tuple[str, ...],
+    has_start: bool,
+    has_end: bool,
+    has_limit: bool,
+    raw_timestamp: bool = False
+) -> str:
+    # raw_timestamp: timestamp sem to_char, para formatos binários (Arrow)
+    columns = ', '.join(v if raw_timestamp else COLUMN_EXPRESSIONS[v] for v in variables)
+    query = f"SELECT {columns} FROM data WHERE 1=1"
+    
+    if has_start:
+        query += " AND timestamp >= %s"
+    
+    if has_end:
+        query += " AND timestamp <= %s"
+    
+    # data.timestamp: "timestamp" sozinho resolveria para o alias to_char da lista de colunas
+    query += " ORDER BY data.timestamp"
+    
+    if has_limit:
+        query += " LIMIT %s"
+    
+    return query
+
 class DatabaseConnection:
     
     def __init__(self):
@@ -23,54 +64,168 @@ class DatabaseConnection:
                 f"{db_password}@{db_host}:"
                 f"{db_port}/{db_name}"
             )
+        
+        # prepare_threshold=None: o PgBouncer em modo transaction não suporta
+        # prepared statements de sessão
+        self._pool = AsyncConnectionPool(
+            self.connection_string,
+            min_size=int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            max_size=int(os.getenv('DB_POOL_MAX_SIZE', str(2 * (os.cpu_count() or 1)))),
+            kwargs={'row_factory': dict_row, 'prepare_threshold': None},
+            open=False
+        )
+    
+    async def open(self):
+        await self._pool.open()
+    
+    async def close(self):
+        await self._pool.close()
+    
+    async def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor(binary=True) as cursor:
+                    await cursor.execute(query, params)
+                    return await cursor.fetchall()
+        except Exception as e:
+            sqlstate = getattr(e, 'sqlstate', None)
+            logger.exception("Erro ao executar query (sqlstate=%s)", sqlstate, extra={'sqlstate': sqlstate})
+            raise
     
-    def get_connection(self):
-        return psycopg2.connect(self.connection_string)
+    async def execute_pipeline(
+        self,
+        queries: List[Tuple[str, Optional[tuple]]]
+    ) -> List[List[Dict[str, Any]]]:
+        try:
+            async with self._pool.connection() as conn:
+                cursors = []
+                async with conn.pipeline():
+                    for query, params in queries:
+                        cursor = conn.cursor(binary=True)
+                        await cursor.execute(query, params)
+                        cursors.append(cursor)
+                return [await cursor.fetchall() for cursor in cursors]
+        except Exception as e:
+            sqlstate = getattr(e, 'sqlstate', None)
+            logger.exception("Erro ao executar query (sqlstate=%s)", sqlstate, extra={'sqlstate': sqlstate})
+            raise
     
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+    async def stream_query(
+        self,
+        query: str,
+        params: Optional[tuple] = None,
+        itersize: int = 2000
+    ) -> AsyncIterator[Dict[str, Any]]:
         try:
-            with self.get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute(query, params)
-                    results = cursor.fetchall()
-                    return [dict(row) for row in results]
+            async with self._pool.connection() as conn:
+                async with conn.cursor(name='stream', binary=True) as cursor:
+                    cursor.itersize = itersize
+                    await cursor.execute(query, params)
+                    async for row in cursor:
+                        yield row
         except Exception as e:
-            print(f"Erro ao executar query: {e}")
+            sqlstate = getattr(e, 'sqlstate', None)
+            logger.exception("Erro ao executar query (sqlstate=%s)", sqlstate, extra={'sqlstate': sqlstate})
             raise
     
-    def get_data_with_filters(
+    async def stream_query_batches(
+        self,
+        query: str,
+        params: Optional[tuple] = None,
+        batch_size: int = 2000
+    ) -> AsyncIterator[List[tuple]]:
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor(name='stream', binary=True, row_factory=tuple_row) as cursor:
+                    await cursor.execute(query, params)
+                    while batch := await cursor.fetchmany(batch_size):
+                        yield batch
+        except Exception as e:
+            sqlstate = getattr(e, 'sqlstate', None)
+            logger.exception("Erro ao executar query (sqlstate=%s)", sqlstate, extra={'sqlstate': sqlstate})
+            raise
+    
+    def _build_data_query(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        variables: Optional[List[str]],
+        limit: Optional[int] = None,
+        raw_timestamp: bool = False
+    ) -> Tuple[str, Optional[tuple]]:
+        params = [p for p in (start_date, end_date, limit) if p]
+        query = build_data_query(
+            tuple(variables) if variables else DEFAULT_VARIABLES,
+            bool(start_date),
+            bool(end_date),
+            bool(limit),
+            raw_timestamp
+        )
+        
+        return query, tuple(params) if params else None
+    
+    async def get_data_with_filters(
         self, 
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        variables: Optional[List[str]] = None
+        variables: Optional[List[str]] = None,
+        limit: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        if not variables:
-            variables = ['timestamp', 'wind_speed', 'power', 'ambient_temprature']
-        
-        columns = ', '.join(variables)
-        query = f"SELECT {columns} FROM data WHERE 1=1"
-        params = []
-        
-        if start_date:
-            query += " AND timestamp >= %s"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND timestamp <= %s"
-            params.append(end_date)
+        query, params = self._build_data_query(start_date, end_date, variables, limit)
+        return await self.execute_query(query, params)
+    
+    async def get_data_with_count_estimate(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        variables: Optional[List[str]] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        query, params = self._build_data_query(start_date, end_date, variables, limit)
+        data, estimate = await self.execute_pipeline([
+            (query, params),
+            (DATA_COUNT_ESTIMATE_QUERY, None)
+        ])
         
-        query += " ORDER BY timestamp"
+        # reltuples vale -1 enquanto a tabela não passou por VACUUM/ANALYZE
+        if not estimate or estimate[0]['estimate'] < 0:
+            return data, await self.get_data_count()
         
-        return self.execute_query(query, tuple(params) if params else None)
+        return data, estimate[0]['estimate']
+    
+    def stream_data_with_filters(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        variables: Optional[List[str]] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        query, params = self._build_data_query(start_date, end_date, variables, limit)
+        return self.stream_query(query, params)
+    
+    def stream_data_batches_with_filters(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        variables: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        batch_size: int = 2000
+    ) -> AsyncIterator[List[tuple]]:
+        # Lotes de tuplas com timestamp nativo, para montar colunas Arrow sem dicts
+        query, params = self._build_data_query(start_date, end_date, variables, limit, raw_timestamp=True)
+        return self.stream_query_batches(query, params, batch_size)
+    
+    async def ping(self) -> None:
+        await self.execute_query("SELECT 1")
     
-    def get_data_count(self) -> int:
+    async def get_data_count(self) -> int:
         query = "SELECT COUNT(*) as count FROM data"
-        result = self.execute_query(query)
+        result = await self.execute_query(query)
         return result[0]['count'] if result else 0
     
-    def get_data_range(self) -> Dict[str, datetime]:
+    async def get_data_range(self) -> Dict[str, datetime]:
         query = "SELECT MIN(timestamp) as min_date, MAX(timestamp) as max_date FROM data"
-        result = self.execute_query(query)
+        result = await self.execute_query(query)
         return result[0] if result else {}
 
 db = DatabaseConnection()
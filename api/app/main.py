@@ -1,18 +1,64 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from datetime import datetime
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple, Any, Callable, Awaitable
+from cachetools import TTLCache
+from datetime import datetime, timedelta
+import os
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import io
+import orjson
+import pyarrow as pa
 
-from .database import db
+from .database import db, DEFAULT_VARIABLES
 
-logging.basicConfig(level=logging.INFO)
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
 logger = logging.getLogger(__name__)
 
+VALID_VARIABLES = frozenset(DEFAULT_VARIABLES)
+MAX_QUERY_RANGE = timedelta(days=31)
+MAX_QUERY_LIMIT = 100000
+DEFAULT_QUERY_LIMIT = 10000
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_BATCH_SIZE = 2000
+ARROW_COLUMN_TYPES = {
+    'timestamp': pa.timestamp('us'),
+    'wind_speed': pa.float32(),
+    'power': pa.float32(),
+    'ambient_temprature': pa.float32()
+}
+
+stats_cache = TTLCache(maxsize=8, ttl=int(os.getenv('API_CACHE_TTL', '60')))
+
+async def cached(key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+    if key in stats_cache:
+        return stats_cache[key]
+    
+    value = await loader()
+    stats_cache[key] = value
+    return value
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    await db.open()
+    yield
+    await db.close()
+    log_listener.stop()
+
 app = FastAPI(
     title="Delfos ETL API",
     description="API para expor dados do banco de dados Fonte",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -32,6 +78,7 @@ async def root():
         "data_period": "10/08/2025 a 20/08/2025 (11 dias)",
         "endpoints": {
             "data": "/data/ - Consulta dados com filtros",
+            "stream": "/data/stream - Consulta dados com filtros em NDJSON ou Arrow IPC (Accept: application/vnd.apache.arrow.stream)",
             "health": "/health - Status da API e banco",
             "info": "/info - Informações sobre dados disponíveis",
             "docs": "/docs - Documentação interativa"
@@ -46,7 +93,9 @@ async def root():
 @app.get("/health")
 async def health_check():
     try:
-        count = db.get_data_count()
+        # Consulta ao vivo: total_records pode vir do cache, o status da conexão não
+        await db.ping()
+        count = await cached('data_count', db.get_data_count)
         return {
             "status": "healthy",
             "database_connection": "ok",
@@ -60,8 +109,8 @@ async def health_check():
 @app.get("/info")
 async def get_info():
     try:
-        count = db.get_data_count()
-        date_range = db.get_data_range()
+        count = await cached('data_count', db.get_data_count)
+        date_range = await cached('data_range', db.get_data_range)
         
         return {
             "total_records": count,
@@ -77,6 +126,68 @@ async def get_info():
         logger.error(f"Error getting info: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving information: {str(e)}")
 
+def parse_data_filters(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    variables: Optional[str]
+) -> Tuple[Optional[datetime], Optional[datetime], Optional[List[str]]]:
+    start_dt = None
+    end_dt = None
+    
+    if start_date:
+        try:
+            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+        except ValueError:
+            raise HTTPException(
+                status_code=400, 
+                detail="Formato de data inválido para start_date. Use formato ISO (ex: 2025-08-10T00:00:00)"
+            )
+    
+    if end_date:
+        try:
+            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        except ValueError:
+            raise HTTPException(
+                status_code=400, 
+                detail="Formato de data inválido para end_date. Use formato ISO (ex: 2025-08-11T00:00:00)"
+            )
+    
+    if start_dt and end_dt:
+        if end_dt < start_dt:
+            raise HTTPException(
+                status_code=400,
+                detail="end_date deve ser posterior a start_date"
+            )
+        if end_dt - start_dt > MAX_QUERY_RANGE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Intervalo máximo de consulta é de {MAX_QUERY_RANGE.days} dias"
+            )
+    
+    variable_list = None
+    if variables:
+        variable_list = [v.strip() for v in variables.split(',')]
+        
+        invalid_vars = [v for v in variable_list if v not in VALID_VARIABLES]
+        
+        if invalid_vars:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Variáveis inválidas: {invalid_vars}. Variáveis válidas: {list(DEFAULT_VARIABLES)}"
+            )
+    
+    return start_dt, end_dt, variable_list
+
+def apply_default_limit(
+    start_dt: Optional[datetime],
+    end_dt: Optional[datetime],
+    limit: Optional[int]
+) -> Optional[int]:
+    # Sem start_date e end_date a consulta não é limitada pelo MAX_QUERY_RANGE
+    if limit is None and not (start_dt and end_dt):
+        return DEFAULT_QUERY_LIMIT
+    return limit
+
 @app.get("/data/")
 async def get_data(
     start_date: Optional[str] = Query(
@@ -93,69 +204,43 @@ async def get_data(
         None,
         description="Lista de variáveis separadas por vírgula (ex: wind_speed,power)",
         example="wind_speed,power"
+    ),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=MAX_QUERY_LIMIT,
+        description=f"Número máximo de registros retornados (padrão {DEFAULT_QUERY_LIMIT} sem start_date e end_date)",
+        example=1440
     )
 ):
     try:
-        start_dt = None
-        end_dt = None
-        
-        if start_date:
-            try:
-                start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            except ValueError:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Formato de data inválido para start_date. Use formato ISO (ex: 2025-08-10T00:00:00)"
-                )
-        
-        if end_date:
-            try:
-                end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            except ValueError:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Formato de data inválido para end_date. Use formato ISO (ex: 2025-08-11T00:00:00)"
-                )
+        start_dt, end_dt, variable_list = parse_data_filters(start_date, end_date, variables)
+        limit = apply_default_limit(start_dt, end_dt, limit)
         
-        variable_list = None
-        if variables:
-            variable_list = [v.strip() for v in variables.split(',')]
-            
-            valid_variables = ['timestamp', 'wind_speed', 'power', 'ambient_temprature']
-            invalid_vars = [v for v in variable_list if v not in valid_variables]
-            
-            if invalid_vars:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Variáveis inválidas: {invalid_vars}. Variáveis válidas: {valid_variables}"
-                )
-        
-        data = db.get_data_with_filters(
+        data, total_records_estimate = await db.get_data_with_count_estimate(
             start_date=start_dt,
             end_date=end_dt,
-            variables=variable_list
+            variables=variable_list,
+            limit=limit
         )
         
-        for record in data:
-            if 'timestamp' in record and record['timestamp']:
-                record['timestamp'] = record['timestamp'].isoformat()
-        
-        return {
+        return ORJSONResponse({
             "data": data,
             "count": len(data),
             "filters": {
                 "start_date": start_date,
                 "end_date": end_date,
-                "variables": variables
+                "variables": variables,
+                "limit": limit
             },
             "metadata": {
                 "query_executed_at": datetime.now().isoformat(),
                 "data_period_available": "10/08/2025 a 20/08/2025",
-                "total_records_available": db.get_data_count(),
+                "total_records_available": total_records_estimate,
                 "frequency": "1 minuto",
-                "columns_returned": variable_list if variable_list else ["timestamp", "wind_speed", "power", "ambient_temprature"]
+                "columns_returned": variable_list if variable_list else list(DEFAULT_VARIABLES)
             }
-        }
+        })
         
     except HTTPException:
         raise
@@ -163,10 +248,84 @@ async def get_data(
         logger.error(f"Error querying data: {e}")
         raise HTTPException(status_code=500, detail=f"Error querying data: {str(e)}")
 
+async def arrow_stream(batches, schema: pa.Schema):
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    
+    def flush() -> bytes:
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return chunk
+    
+    async for batch in batches:
+        columns = zip(*batch)
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema
+        ))
+        yield flush()
+    
+    writer.close()
+    yield flush()
+
+@app.get("/data/stream")
+async def stream_data(
+    request: Request,
+    start_date: Optional[str] = Query(
+        None, 
+        description="Data de início no formato ISO (ex: 2025-08-10T00:00:00)",
+        example="2025-08-10T00:00:00"
+    ),
+    end_date: Optional[str] = Query(
+        None, 
+        description="Data de fim no formato ISO (ex: 2025-08-11T00:00:00)",
+        example="2025-08-11T00:00:00"
+    ),
+    variables: Optional[str] = Query(
+        None,
+        description="Lista de variáveis separadas por vírgula (ex: wind_speed,power)",
+        example="wind_speed,power"
+    ),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=MAX_QUERY_LIMIT,
+        description=f"Número máximo de registros retornados (padrão {DEFAULT_QUERY_LIMIT} sem start_date e end_date)",
+        example=1440
+    )
+):
+    start_dt, end_dt, variable_list = parse_data_filters(start_date, end_date, variables)
+    limit = apply_default_limit(start_dt, end_dt, limit)
+    
+    if ARROW_STREAM_MEDIA_TYPE in request.headers.get('accept', ''):
+        batches = db.stream_data_batches_with_filters(
+            start_date=start_dt,
+            end_date=end_dt,
+            variables=variable_list,
+            limit=limit,
+            batch_size=ARROW_BATCH_SIZE
+        )
+        schema = pa.schema([(v, ARROW_COLUMN_TYPES[v]) for v in variable_list or DEFAULT_VARIABLES])
+        return StreamingResponse(arrow_stream(batches, schema), media_type=ARROW_STREAM_MEDIA_TYPE)
+    
+    rows = db.stream_data_with_filters(
+        start_date=start_dt,
+        end_date=end_dt,
+        variables=variable_list,
+        limit=limit
+    )
+    
+    async def ndjson_lines():
+        async for row in rows:
+            yield orjson.dumps(row) + b"\n"
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @app.get("/data/count")
 async def get_data_count():
     try:
-        count = db.get_data_count()
+        count = await cached('data_count', db.get_data_count)
         return {"total_records": count}
     except Exception as e:
         logger.error(f"Error getting count: {e}")
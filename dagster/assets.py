@@ -1,3 +1,4 @@
+import io
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -9,7 +10,6 @@ from dagster import (
     MetadataValue
 )
 from sqlalchemy import text
-import httpx
 from typing import Dict, Any
 
 daily_partitions = DailyPartitionsDefinition(
@@ -17,15 +17,76 @@ daily_partitions = DailyPartitionsDefinition(
     end_date="2025-08-20"
 )
 
+# {buckets}: data_10m filtrada pela partição ou, com a view desatualizada, a mesma
+# agregação calculada direto sobre data (FonteDatabaseResource.data_10m_buckets)
+AGGREGATED_DATA_QUERY = """
+    WITH buckets AS ({buckets})
+    SELECT 
+        b.bucket AS timestamp,
+        s.signal_name,
+        s.value
+    FROM buckets b
+    CROSS JOIN LATERAL (VALUES
+        ('wind_speed_mean', b.wind_speed_mean),
+        ('wind_speed_min', b.wind_speed_min),
+        ('wind_speed_max', b.wind_speed_max),
+        ('wind_speed_std', b.wind_speed_std),
+        ('power_mean', b.power_mean),
+        ('power_min', b.power_min),
+        ('power_max', b.power_max),
+        ('power_std', b.power_std)
+    ) AS s(signal_name, value)
+    WHERE s.value IS NOT NULL
+    ORDER BY b.bucket
+"""
+
+# Estatísticas do dia combinadas a partir dos buckets: média ponderada
+# pelas contagens e variância agrupada (within + between buckets)
+DATA_SUMMARY_QUERY = """
+    WITH buckets AS ({buckets}),
+    totals AS (
+        SELECT 
+            SUM(samples) AS records,
+            SUM(wind_speed_count) AS wind_speed_count,
+            SUM(wind_speed_mean * wind_speed_count) / NULLIF(SUM(wind_speed_count), 0) AS wind_speed_mean,
+            MIN(wind_speed_min) AS wind_speed_min,
+            MAX(wind_speed_max) AS wind_speed_max,
+            SUM(power_count) AS power_count,
+            SUM(power_mean * power_count) / NULLIF(SUM(power_count), 0) AS power_mean,
+            MIN(power_min) AS power_min,
+            MAX(power_max) AS power_max
+        FROM buckets
+    )
+    SELECT 
+        t.records,
+        t.wind_speed_mean,
+        t.wind_speed_min,
+        t.wind_speed_max,
+        SQRT(SUM(
+            (b.wind_speed_count - 1) * COALESCE(b.wind_speed_std ^ 2, 0)
+            + b.wind_speed_count * (b.wind_speed_mean - t.wind_speed_mean) ^ 2
+        ) / NULLIF(t.wind_speed_count - 1, 0)) AS wind_speed_std,
+        t.power_mean,
+        t.power_min,
+        t.power_max,
+        SQRT(SUM(
+            (b.power_count - 1) * COALESCE(b.power_std ^ 2, 0)
+            + b.power_count * (b.power_mean - t.power_mean) ^ 2
+        ) / NULLIF(t.power_count - 1, 0)) AS power_std
+    FROM totals t
+    LEFT JOIN buckets b ON true
+    GROUP BY t.records, t.wind_speed_count, t.wind_speed_mean, t.wind_speed_min, t.wind_speed_max,
+             t.power_count, t.power_mean, t.power_min, t.power_max
+"""
+
 @asset(
     partitions_def=daily_partitions,
     description="Dados agregados de sensores processados diariamente",
-    required_resource_keys={"fonte_db", "alvo_db", "api"}
+    required_resource_keys={"fonte_db", "alvo_db"}
 )
 def processed_sensor_data(context: AssetExecutionContext) -> Output[Dict[str, Any]]:
     fonte_db = context.resources.fonte_db
     alvo_db = context.resources.alvo_db
-    api_client = context.resources.api
     
     partition_date = context.partition_key
     target_date = datetime.strptime(partition_date, "%Y-%m-%d")
@@ -39,18 +100,18 @@ def processed_sensor_data(context: AssetExecutionContext) -> Output[Dict[str, An
         end_date = start_date + timedelta(days=1)
         
         params = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat(),
-            'variables': 'timestamp,wind_speed,power'
+            'start_date': start_date,
+            'end_date': end_date
         }
         
-        with api_client.get_client() as client:
-            response = client.get("/data/", params=params)
-            response.raise_for_status()
+        with fonte_db.get_engine().connect() as conn:
+            buckets, fresh = fonte_db.data_10m_buckets(conn, start_date, end_date)
+            if not fresh:
+                context.log.info("data_10m desatualizada para a partição; agregando direto da tabela data")
             
-            data = response.json()
+            summary_row = conn.execute(text(DATA_SUMMARY_QUERY.format(buckets=buckets)), params).mappings().one()
             
-            if not data.get('data'):
+            if not summary_row['records']:
                 context.log.warning(f"Nenhum dado encontrado para {partition_date}")
                 return Output(
                     value={
@@ -67,41 +128,39 @@ def processed_sensor_data(context: AssetExecutionContext) -> Output[Dict[str, An
                     }
                 )
             
-            df = pd.DataFrame(data['data'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-            context.log.info(f"Extraídos {len(df)} registros")
-        
-        context.log.info("Iniciando transformação dos dados...")
-        
-        df = df.set_index('timestamp')
-        
-        wind_speed_agg = df['wind_speed'].resample('10T').agg(['mean', 'min', 'max', 'std'])
-        wind_speed_agg.columns = ['wind_speed_mean', 'wind_speed_min', 'wind_speed_max', 'wind_speed_std']
+            long_df = pd.read_sql_query(
+                text(AGGREGATED_DATA_QUERY.format(buckets=buckets)),
+                conn,
+                params=params,
+                parse_dates=['timestamp']
+            )
         
-        power_agg = df['power'].resample('10T').agg(['mean', 'min', 'max', 'std'])
-        power_agg.columns = ['power_mean', 'power_min', 'power_max', 'power_std']
+        summary = {
+            'wind_speed': {
+                'mean': summary_row['wind_speed_mean'],
+                'min': summary_row['wind_speed_min'],
+                'max': summary_row['wind_speed_max'],
+                'std': summary_row['wind_speed_std']
+            },
+            'power': {
+                'mean': summary_row['power_mean'],
+                'min': summary_row['power_min'],
+                'max': summary_row['power_max'],
+                'std': summary_row['power_std']
+            }
+        }
         
-        aggregated_df = pd.concat([wind_speed_agg, power_agg], axis=1)
-        aggregated_df = aggregated_df.dropna(how='all')
+        records_processed = int(summary_row['records'])
+        intervals_processed = int(long_df['timestamp'].nunique())
         
-        aggregated_df = aggregated_df.reset_index()
-        long_df = aggregated_df.melt(
-            id_vars=['timestamp'],
-            var_name='signal_name',
-            value_name='value'
+        context.log.info(
+            f"Extraídos {len(long_df)} registros agregados "
+            f"({intervals_processed} intervalos de 10 minutos, {records_processed} leituras)"
         )
-        long_df = long_df.dropna()
-        
-        context.log.info(f"Transformação concluída: {len(long_df)} registros")
         
         context.log.info("Iniciando carga dos dados...")
         
-        with alvo_db.get_engine().connect() as conn:
-            result = conn.execute(text("SELECT id, name FROM signal"))
-            signal_mapping = {row.name: row.id for row in result}
-        
-        long_df['signal_id'] = long_df['signal_name'].map(signal_mapping)
+        long_df['signal_id'] = long_df['signal_name'].map(alvo_db.signal_mapping)
         
         long_df = long_df.dropna(subset=['signal_id'])
         
@@ -111,37 +170,55 @@ def processed_sensor_data(context: AssetExecutionContext) -> Output[Dict[str, An
                 value={
                     'date': partition_date,
                     'status': 'no_valid_data',
-                    'records_processed': len(df),
+                    'records_processed': records_processed,
                     'records_inserted': 0,
                     'intervals_processed': 0
                 },
                 metadata={
                     "date": MetadataValue.text(partition_date),
                     "status": MetadataValue.text("no_valid_data"),
-                    "records_processed": MetadataValue.int(len(df)),
+                    "records_processed": MetadataValue.int(records_processed),
                     "records_inserted": MetadataValue.int(0)
                 }
             )
         
         df_to_insert = long_df[['timestamp', 'signal_id', 'value']].copy()
+        df_to_insert['signal_id'] = df_to_insert['signal_id'].astype('int64')
         
-        rows_inserted = df_to_insert.to_sql(
-            'data',
-            alvo_db.get_engine(),
-            if_exists='append',
-            index=False,
-            method='multi',
-            chunksize=1000
-        )
+        buffer = io.StringIO()
+        df_to_insert.to_csv(buffer, index=False, header=False, sep='\t')
+        buffer.seek(0)
+        
+        alvo_db.ensure_data_schema()
+        
+        conn = alvo_db.get_engine().raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TEMP TABLE data_staging (timestamp TIMESTAMP, signal_id INTEGER, value REAL) ON COMMIT DROP"
+                )
+                cursor.copy_expert(
+                    "COPY data_staging (timestamp, signal_id, value) FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t')",
+                    buffer
+                )
+                cursor.execute("""
+                    INSERT INTO data (timestamp, signal_id, value)
+                    SELECT timestamp, signal_id, value FROM data_staging
+                    ON CONFLICT (timestamp, signal_id) DO NOTHING
+                """)
+                rows_inserted = cursor.rowcount
+            conn.commit()
+        finally:
+            conn.close()
         
         context.log.info(f"Carga concluída: {rows_inserted} registros inseridos")
         
         result = {
             'date': partition_date,
             'status': 'success',
-            'records_processed': len(df),
+            'records_processed': records_processed,
             'records_inserted': rows_inserted,
-            'intervals_processed': len(aggregated_df)
+            'intervals_processed': intervals_processed
         }
         
         return Output(
@@ -149,21 +226,11 @@ def processed_sensor_data(context: AssetExecutionContext) -> Output[Dict[str, An
             metadata={
                 "date": MetadataValue.text(partition_date),
                 "status": MetadataValue.text("success"),
-                "records_processed": MetadataValue.int(len(df)),
+                "records_processed": MetadataValue.int(records_processed),
                 "records_inserted": MetadataValue.int(rows_inserted),
-                "intervals_processed": MetadataValue.int(len(aggregated_df)),
-                "wind_speed_stats": MetadataValue.json({
-                    "mean": float(df['wind_speed'].mean()),
-                    "min": float(df['wind_speed'].min()),
-                    "max": float(df['wind_speed'].max()),
-                    "std": float(df['wind_speed'].std())
-                }),
-                "power_stats": MetadataValue.json({
-                    "mean": float(df['power'].mean()),
-                    "min": float(df['power'].min()),
-                    "max": float(df['power'].max()),
-                    "std": float(df['power'].std())
-                })
+                "intervals_processed": MetadataValue.int(intervals_processed),
+                "wind_speed_stats": MetadataValue.json(summary['wind_speed']),
+                "power_stats": MetadataValue.json(summary['power'])
             }
         )
         
@@ -186,6 +253,31 @@ def processed_sensor_data(context: AssetExecutionContext) -> Output[Dict[str, An
             }
         )
 
+@asset(
+    description="Atualiza a materialized view data_10m (agregação em 10 minutos do banco fonte)",
+    required_resource_keys={"fonte_db"}
+)
+def fonte_data_10m(context: AssetExecutionContext) -> Output[Dict[str, Any]]:
+    fonte_db = context.resources.fonte_db
+    
+    try:
+        context.log.info("Atualizando data_10m...")
+        fonte_db.refresh_data_10m()
+        
+        with fonte_db.get_engine().connect() as conn:
+            buckets = conn.execute(text("SELECT COUNT(*) FROM data_10m")).scalar()
+        
+        context.log.info(f"data_10m atualizada: {buckets} intervalos de 10 minutos")
+        
+        return Output(
+            value={'buckets': buckets},
+            metadata={"buckets": MetadataValue.int(buckets)}
+        )
+        
+    except Exception as e:
+        context.log.error(f"Erro ao atualizar data_10m: {e}")
+        raise
+
 @asset(
     description="Visualização dos dados processados no banco alvo",
     required_resource_keys={"alvo_db"}
@@ -256,46 +348,33 @@ def alvo_database_structure(context: AssetExecutionContext) -> Output[Dict[str,
     
     try:
         with alvo_db.get_engine().connect() as conn:
-            context.log.info("Consultando estrutura da tabela signal...")
-            
-            result = conn.execute(text("""
-                SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default
-                FROM information_schema.columns 
-                WHERE table_name = 'signal' 
-                ORDER BY ordinal_position
-            """))
-            signal_structure = [dict(row._mapping) for row in result]
-            
-            result = conn.execute(text("SELECT * FROM signal ORDER BY id"))
-            signal_data = [dict(row._mapping) for row in result]
-            
-            context.log.info("Consultando estrutura da tabela data...")
+            context.log.info("Consultando estrutura das tabelas e relacionamentos...")
             
             result = conn.execute(text("""
                 SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default
+                    table_name || '_columns' AS kind,
+                    ordinal_position AS position,
+                    json_build_object(
+                        'column_name', column_name,
+                        'data_type', data_type,
+                        'is_nullable', is_nullable,
+                        'column_default', column_default
+                    ) AS info
                 FROM information_schema.columns 
-                WHERE table_name = 'data' 
-                ORDER BY ordinal_position
-            """))
-            data_structure = [dict(row._mapping) for row in result]
-            
-            context.log.info("Consultando relacionamentos...")
-            
-            result = conn.execute(text("""
+                WHERE table_name IN ('signal', 'data')
+                
+                UNION ALL
+                
                 SELECT 
-                    tc.constraint_name,
-                    tc.table_name,
-                    kcu.column_name,
-                    ccu.table_name AS foreign_table_name,
-                    ccu.column_name AS foreign_column_name
+                    'foreign_keys' AS kind,
+                    kcu.ordinal_position AS position,
+                    json_build_object(
+                        'constraint_name', tc.constraint_name,
+                        'table_name', tc.table_name,
+                        'column_name', kcu.column_name,
+                        'foreign_table_name', ccu.table_name,
+                        'foreign_column_name', ccu.column_name
+                    ) AS info
                 FROM information_schema.table_constraints AS tc
                 JOIN information_schema.key_column_usage AS kcu
                     ON tc.constraint_name = kcu.constraint_name
@@ -303,8 +382,28 @@ def alvo_database_structure(context: AssetExecutionContext) -> Output[Dict[str,
                     ON ccu.constraint_name = tc.constraint_name
                 WHERE tc.constraint_type = 'FOREIGN KEY' 
                 AND tc.table_name = 'data'
+                
+                UNION ALL
+                
+                SELECT 
+                    'data_count' AS kind,
+                    0 AS position,
+                    json_build_object('total_records', COUNT(*)) AS info
+                FROM data
+                
+                ORDER BY kind, position
             """))
-            foreign_keys = [dict(row._mapping) for row in result]
+            metadata_rows = result.fetchall()
+            
+            signal_structure = [row.info for row in metadata_rows if row.kind == 'signal_columns']
+            data_structure = [row.info for row in metadata_rows if row.kind == 'data_columns']
+            foreign_keys = [row.info for row in metadata_rows if row.kind == 'foreign_keys']
+            total_data_records = next(
+                row.info['total_records'] for row in metadata_rows if row.kind == 'data_count'
+            )
+            
+            result = conn.execute(text("SELECT * FROM signal ORDER BY id"))
+            signal_data = [dict(row._mapping) for row in result]
             
             context.log.info("Consultando amostra de dados...")
             
@@ -356,7 +455,7 @@ def alvo_database_structure(context: AssetExecutionContext) -> Output[Dict[str,
                         "description": "Tabela de dados processados dos sensores",
                         "structure": data_structure,
                         "sample_data": data_sample,
-                        "total_records": sum(stat['total_records'] for stat in signal_statistics)
+                        "total_records": total_data_records
                     }
                 },
                 "relationships": {
@@ -366,7 +465,7 @@ def alvo_database_structure(context: AssetExecutionContext) -> Output[Dict[str,
                 "statistics": {
                     "signals": signal_statistics,
                     "data_distribution": {
-                        "total_records": sum(stat['total_records'] for stat in signal_statistics),
+                        "total_records": total_data_records,
                         "signals_count": len(signal_statistics),
                         "data_range": {
                             "min_timestamp": min((row['timestamp'] for row in data_sample), default=None),
@@ -383,7 +482,7 @@ def alvo_database_structure(context: AssetExecutionContext) -> Output[Dict[str,
                 metadata={
                     "tables_count": MetadataValue.int(2),
                     "signals_count": MetadataValue.int(len(signal_data)),
-                    "total_data_records": MetadataValue.int(sum(stat['total_records'] for stat in signal_statistics)),
+                    "total_data_records": MetadataValue.int(total_data_records),
                     "foreign_keys_count": MetadataValue.int(len(foreign_keys)),
                     "sample_records": MetadataValue.int(len(data_sample))
                 }
@@ -10,7 +10,7 @@ from dagster import (
     Definitions,
     load_assets_from_modules
 )
-from assets import processed_sensor_data, alvo_database_summary, alvo_database_structure
+from assets import processed_sensor_data, fonte_data_10m, alvo_database_summary, alvo_database_structure
 from resources import (
     FonteDatabaseResource,
     AlvoDatabaseResource,
@@ -25,6 +25,12 @@ sensor_data_job = define_asset_job(
     description="Job para processar dados de sensores via ETL"
 )
 
+data_10m_refresh_job = define_asset_job(
+    name="data_10m_refresh_job",
+    selection=[fonte_data_10m],
+    description="Job para atualizar a materialized view data_10m do banco fonte"
+)
+
 alvo_summary_job = define_asset_job(
     name="alvo_database_summary_job",
     selection=[alvo_database_summary],
@@ -37,6 +43,13 @@ alvo_structure_job = define_asset_job(
     description="Job para visualizar estrutura completa das tabelas e dados"
 )
 
+data_10m_refresh_schedule = ScheduleDefinition(
+    job=data_10m_refresh_job,
+    cron_schedule="30 0 * * *",
+    name="data_10m_refresh_schedule",
+    description="Atualiza data_10m diariamente às 0h30, antes do ETL diário"
+)
+
 daily_sensor_etl_schedule = ScheduleDefinition(
     job=sensor_data_job,
     cron_schedule="0 1 * * *",
@@ -52,9 +65,9 @@ historical_sensor_etl_schedule = ScheduleDefinition(
 )
 
 defs = Definitions(
-    assets=[processed_sensor_data, alvo_database_summary, alvo_database_structure],
-    jobs=[sensor_data_job, alvo_summary_job, alvo_structure_job],
-    schedules=[daily_sensor_etl_schedule, historical_sensor_etl_schedule],
+    assets=[processed_sensor_data, fonte_data_10m, alvo_database_summary, alvo_database_structure],
+    jobs=[sensor_data_job, data_10m_refresh_job, alvo_summary_job, alvo_structure_job],
+    schedules=[data_10m_refresh_schedule, daily_sensor_etl_schedule, historical_sensor_etl_schedule],
     resources={
         "fonte_db": FonteDatabaseResource(
             config=DatabaseConfig(
@@ -1,9 +1,67 @@
 import os
-from dagster import ConfigurableResource, Config
-from sqlalchemy import create_engine
+from functools import cached_property
+from dagster import ConfigurableResource, Config, InitResourceContext
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 import httpx
-from typing import Optional
+from typing import Optional, Dict
+from datetime import datetime
+
+DATA_10M_COLUMNS = """
+    date_bin('10 minutes', timestamp, TIMESTAMP '2000-01-01') AS bucket,
+    COUNT(*) AS samples,
+    COUNT(wind_speed) AS wind_speed_count,
+    AVG(wind_speed) AS wind_speed_mean,
+    MIN(wind_speed) AS wind_speed_min,
+    MAX(wind_speed) AS wind_speed_max,
+    STDDEV_SAMP(wind_speed) AS wind_speed_std,
+    COUNT(power) AS power_count,
+    AVG(power) AS power_mean,
+    MIN(power) AS power_min,
+    MAX(power) AS power_max,
+    STDDEV_SAMP(power) AS power_std
+"""
+
+DATA_10M_DDL = text(f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS data_10m AS
+    SELECT {DATA_10M_COLUMNS}
+    FROM data
+    GROUP BY 1;
+    
+    CREATE UNIQUE INDEX IF NOT EXISTS data_10m_bucket ON data_10m (bucket);
+""")
+
+DATA_10M_FROM_VIEW = "SELECT * FROM data_10m WHERE bucket >= :start_date AND bucket < :end_date"
+
+DATA_10M_FROM_DATA = f"""
+    SELECT {DATA_10M_COLUMNS}
+    FROM data
+    WHERE timestamp >= :start_date AND timestamp < :end_date
+    GROUP BY 1
+"""
+
+DATA_10M_STALE_QUERY = text("""
+    SELECT 
+        (SELECT COUNT(*) FROM data
+         WHERE timestamp >= :start_date AND timestamp < :end_date) AS raw_records,
+        (SELECT COALESCE(SUM(samples), 0) FROM data_10m
+         WHERE bucket >= :start_date AND bucket < :end_date) AS rollup_records
+""")
+
+# database/migrate_alvo_data.sql, copiado para junto deste arquivo na imagem
+ALVO_DATA_MIGRATION_FILE = 'migrate_alvo_data.sql'
+
+def load_alvo_data_migration():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in (
+        os.path.join(base_dir, ALVO_DATA_MIGRATION_FILE),
+        os.path.join(base_dir, '..', 'database', ALVO_DATA_MIGRATION_FILE)
+    ):
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return text(f.read())
+    raise FileNotFoundError(f"{ALVO_DATA_MIGRATION_FILE} não encontrado")
 
 class DatabaseConfig(Config):
     host: str
@@ -20,23 +78,85 @@ class FonteDatabaseResource(ConfigurableResource):
     
     config: DatabaseConfig
     
-    def get_engine(self):
-        return create_engine(self.config.connection_string)
+    @cached_property
+    def _engine(self) -> Engine:
+        return create_engine(
+            self.config.connection_string,
+            pool_pre_ping=True,
+            pool_size=5,
+            max_overflow=10,
+            pool_recycle=1800,
+            executemany_mode='values_plus_batch'
+        )
+    
+    def get_engine(self) -> Engine:
+        return self._engine
     
     def get_session(self):
         engine = self.get_engine()
         return sessionmaker(bind=engine)()
+    
+    def setup_for_execution(self, context: InitResourceContext) -> None:
+        with self.get_engine().begin() as conn:
+            if conn.execute(text("SELECT to_regclass('data_10m')")).scalar() is None:
+                # Serializa a criação entre runs concorrentes do backfill
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('data_10m'))"))
+                conn.execute(DATA_10M_DDL)
+    
+    def refresh_data_10m(self) -> None:
+        with self.get_engine().begin() as conn:
+            conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY data_10m"))
+    
+    def data_10m_buckets(self, conn, start_date: datetime, end_date: datetime):
+        # A view é atualizada pelo job data_10m_refresh_job; se a partição mudou
+        # desde então, agrega só a janela da partição em vez de dar REFRESH na view toda
+        params = {'start_date': start_date, 'end_date': end_date}
+        counts = conn.execute(DATA_10M_STALE_QUERY, params).mappings().one()
+        if counts['raw_records'] == counts['rollup_records']:
+            return DATA_10M_FROM_VIEW, True
+        return DATA_10M_FROM_DATA, False
 
 class AlvoDatabaseResource(ConfigurableResource):
     
     config: DatabaseConfig
     
-    def get_engine(self):
-        return create_engine(self.config.connection_string)
+    @cached_property
+    def _engine(self) -> Engine:
+        return create_engine(
+            self.config.connection_string,
+            pool_pre_ping=True,
+            pool_size=5,
+            max_overflow=10,
+            pool_recycle=1800,
+            executemany_mode='values_plus_batch'
+        )
+    
+    def get_engine(self) -> Engine:
+        return self._engine
     
     def get_session(self):
         engine = self.get_engine()
         return sessionmaker(bind=engine)()
+    
+    @cached_property
+    def _data_migrated(self) -> bool:
+        with self.get_engine().begin() as conn:
+            conn.execute(load_alvo_data_migration())
+        return True
+    
+    def ensure_data_schema(self) -> None:
+        # Executa a migração uma vez por processo
+        self._data_migrated
+    
+    @cached_property
+    def signal_mapping(self) -> Dict[str, int]:
+        with self.get_engine().connect() as conn:
+            result = conn.execute(text("SELECT id, name FROM signal"))
+            return {row.name: row.id for row in result}
+    
+    def refresh_signals(self) -> Dict[str, int]:
+        self.__dict__.pop('signal_mapping', None)
+        return self.signal_mapping
 
 class APIConfig(Config):
     base_url: str
@@ -46,16 +166,27 @@ class APIResource(ConfigurableResource):
     
     config: APIConfig
     
-    def get_client(self) -> httpx.Client:
+    @cached_property
+    def client(self) -> httpx.Client:
+        limits = httpx.Limits(max_keepalive_connections=10, max_connections=20)
         return httpx.Client(
             base_url=self.config.base_url,
-            timeout=self.config.timeout
+            timeout=self.config.timeout,
+            limits=limits,
+            http2=True
         )
     
+    def get_client(self) -> httpx.Client:
+        return self.client
+    
+    def teardown_after_execution(self, context: InitResourceContext) -> None:
+        client = self.__dict__.pop('client', None)
+        if client is not None:
+            client.close()
+    
     def health_check(self) -> bool:
         try:
-            with self.get_client() as client:
-                response = client.get("/health")
-                return response.status_code == 200
+            response = self.client.get("/health")
+            return response.status_code == 200
         except Exception:
             return False
@@ -4,14 +4,24 @@
 CREATE TABLE IF NOT EXISTS data (
     id SERIAL PRIMARY KEY,
     timestamp TIMESTAMP NOT NULL,
-    wind_speed FLOAT,
-    power FLOAT,
-    ambient_temprature FLOAT
+    wind_speed REAL,
+    power REAL,
+    ambient_temprature REAL
 );
 
 -- Criar índice para melhorar performance das consultas por timestamp
+-- (ordenação, ORDER BY ... LIMIT e MIN/MAX)
 CREATE INDEX IF NOT EXISTS idx_data_timestamp ON data(timestamp);
 
+-- Custo de acesso aleatório próximo ao sequencial (armazenamento SSD)
+DO $$
+BEGIN
+    EXECUTE format('ALTER DATABASE %I SET random_page_cost = 1.1', current_database());
+END $$;
+
+-- A materialized view data_10m (agregação em intervalos de 10 minutos) é criada
+-- pelo Dagster (FonteDatabaseResource) e atualizada pelo data_10m_refresh_job
+
 -- Comentários sobre a tabela
 COMMENT ON TABLE data IS 'Tabela contendo dados de sensores com timestamp, velocidade do vento, potência e temperatura ambiente';
 COMMENT ON COLUMN data.timestamp IS 'Timestamp da medição';
@@ -0,0 +1,29 @@
+-- Migração idempotente da tabela data do banco Alvo, executada por
+-- etl/prepare_alvo_db.py e pelo AlvoDatabaseResource do Dagster.
+-- create_all não altera tabelas existentes: bancos criados antes da
+-- uq_data_ts_signal (exigida pelo ON CONFLICT) e de value REAL são migrados aqui
+
+DO $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('uq_data_ts_signal'));
+    IF to_regclass('data') IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'uq_data_ts_signal'
+    ) THEN
+        -- Remove duplicatas (timestamp, signal_id) mantendo o menor id
+        DELETE FROM data d
+        USING data k
+        WHERE d.timestamp = k.timestamp
+          AND d.signal_id = k.signal_id
+          AND d.id > k.id;
+        ALTER TABLE data ADD CONSTRAINT uq_data_ts_signal UNIQUE (timestamp, signal_id);
+    END IF;
+
+    -- Bancos anteriores à migração para REAL: value ainda em double precision
+    IF EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = to_regclass('data') AND attname = 'value'
+          AND format_type(atttypid, atttypmod) = 'double precision'
+    ) THEN
+        ALTER TABLE data ALTER COLUMN value TYPE real;
+    END IF;
+END $$;
@@ -3,39 +3,47 @@
 import os
 import sys
 import psycopg2
+from psycopg2.extras import execute_values
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
 
 def generate_sample_data():
-    start_date = datetime(2025, 8, 10, 0, 0, 0)
-    end_date = datetime(2025, 8, 20, 23, 59, 59)
+    start_ns = np.datetime64('2025-08-10T00:00:00', 'ns').astype(np.int64)
+    end_ns = np.datetime64('2025-08-21T00:00:00', 'ns').astype(np.int64)
     
-    timestamps = pd.date_range(start=start_date, end=end_date, freq='1min')
+    timestamps = np.arange(start_ns, end_ns, 60 * 1_000_000_000, dtype=np.int64)
     
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
+    n = len(timestamps)
     
-    wind_speed = np.random.normal(12, 5, len(timestamps))
-    wind_speed = np.clip(wind_speed, 0, 25)
+    wind_speed = rng.normal(12, 5, n)
+    np.clip(wind_speed, 0, 25, out=wind_speed)
     
-    power = np.where(wind_speed < 3, 0, 
-                    np.where(wind_speed > 20, 2000,
-                            wind_speed ** 2 * 8 + np.random.normal(0, 100, len(timestamps))))
-    power = np.clip(power, 0, 2000)
+    power = np.square(wind_speed)
+    power *= 8
+    power += rng.normal(0, 100, n)
+    power[wind_speed < 3] = 0
+    power[wind_speed > 20] = 2000
+    np.clip(power, 0, 2000, out=power)
     
-    base_temp = 20 + 10 * np.sin(2 * np.pi * np.arange(len(timestamps)) / (24 * 60))
-    ambient_temperature = base_temp + np.random.normal(0, 3, len(timestamps))
+    ambient_temperature = np.sin(np.arange(n) * (2 * np.pi / (24 * 60)))
+    ambient_temperature *= 10
+    ambient_temperature += 20
+    ambient_temperature += rng.normal(0, 3, n)
     
     df = pd.DataFrame({
-        'timestamp': timestamps,
+        'timestamp': pd.to_datetime(timestamps, unit='ns'),
         'wind_speed': wind_speed,
         'power': power,
         'ambient_temprature': ambient_temperature
     })
     
+    columns = ['wind_speed', 'power', 'ambient_temprature']
+    df[columns] = df[columns].astype('float32')
+    
     return df
 
 def insert_data_to_database(df):
@@ -53,25 +61,18 @@ def insert_data_to_database(df):
         
         print(f"Conectado ao banco de dados: {db_config['database']}")
         
-        data_to_insert = []
-        for _, row in df.iterrows():
-            data_to_insert.append((
-                row['timestamp'],
-                row['wind_speed'],
-                row['power'],
-                row['ambient_temprature']
-            ))
+        columns = ['timestamp', 'wind_speed', 'power', 'ambient_temprature']
+        data_to_insert = list(df[columns].itertuples(index=False, name=None))
         
         batch_size = 1000
         for i in range(0, len(data_to_insert), batch_size):
             batch = data_to_insert[i:i + batch_size]
             
-            cursor.executemany(
-                """
-                INSERT INTO data (timestamp, wind_speed, power, ambient_temprature)
-                VALUES (%s, %s, %s, %s)
-                """,
-                batch
+            execute_values(
+                cursor,
+                "INSERT INTO data (timestamp, wind_speed, power, ambient_temprature) VALUES %s",
+                batch,
+                page_size=batch_size
             )
             
             print(f"Inseridos {len(batch)} registros...")
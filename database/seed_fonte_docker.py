@@ -1,13 +1,30 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import sys
+import struct
 import psycopg2
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import time
 
+PG_EPOCH_NS = np.datetime64('2000-01-01T00:00:00', 'ns').astype(np.int64)
+
+FLOAT_COLUMNS = ('wind_speed', 'power', 'ambient_temprature')
+
+# Bancos criados antes da migração para REAL ainda têm colunas double precision
+COPY_FLOAT_FORMATS = {
+    'real': '>f4',
+    'double precision': '>f8'
+}
+
+COLUMN_TYPES_QUERY = """
+    SELECT attname, format_type(atttypid, atttypmod)
+    FROM pg_attribute
+    WHERE attrelid = 'data'::regclass AND attname = ANY(%s)
+"""
+
 def wait_for_database():
     max_attempts = 30
     attempt = 0
@@ -33,34 +50,75 @@ def wait_for_database():
     return False
 
 def generate_sample_data():
-    start_date = datetime(2025, 8, 10, 0, 0, 0)
-    end_date = datetime(2025, 8, 20, 23, 59, 59)
+    start_ns = np.datetime64('2025-08-10T00:00:00', 'ns').astype(np.int64)
+    end_ns = np.datetime64('2025-08-21T00:00:00', 'ns').astype(np.int64)
     
-    timestamps = pd.date_range(start=start_date, end=end_date, freq='1min')
+    timestamps = np.arange(start_ns, end_ns, 60 * 1_000_000_000, dtype=np.int64)
     
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
+    n = len(timestamps)
     
-    wind_speed = np.random.normal(12, 5, len(timestamps))
-    wind_speed = np.clip(wind_speed, 0, 25)
+    wind_speed = rng.normal(12, 5, n)
+    np.clip(wind_speed, 0, 25, out=wind_speed)
     
-    power = np.where(wind_speed < 3, 0, 
-                    np.where(wind_speed > 20, 2000,
-                            wind_speed ** 2 * 8 + np.random.normal(0, 100, len(timestamps))))
-    power = np.clip(power, 0, 2000)
+    power = np.square(wind_speed)
+    power *= 8
+    power += rng.normal(0, 100, n)
+    power[wind_speed < 3] = 0
+    power[wind_speed > 20] = 2000
+    np.clip(power, 0, 2000, out=power)
     
-    base_temp = 20 + 10 * np.sin(2 * np.pi * np.arange(len(timestamps)) / (24 * 60))
-    ambient_temperature = base_temp + np.random.normal(0, 3, len(timestamps))
+    ambient_temperature = np.sin(np.arange(n) * (2 * np.pi / (24 * 60)))
+    ambient_temperature *= 10
+    ambient_temperature += 20
+    ambient_temperature += rng.normal(0, 3, n)
     
-    df = pd.DataFrame({
+    return {
         'timestamp': timestamps,
-        'wind_speed': wind_speed,
-        'power': power,
-        'ambient_temprature': ambient_temperature
-    })
+        'wind_speed': wind_speed.astype(np.float32),
+        'power': power.astype(np.float32),
+        'ambient_temprature': ambient_temperature.astype(np.float32)
+    }
+
+def get_float_formats(cursor):
+    cursor.execute(COLUMN_TYPES_QUERY, (list(FLOAT_COLUMNS),))
+    column_types = dict(cursor.fetchall())
+    
+    formats = {}
+    for column in FLOAT_COLUMNS:
+        column_type = column_types.get(column)
+        if column_type not in COPY_FLOAT_FORMATS:
+            raise ValueError(f"Tipo não suportado para COPY binário em data.{column}: {column_type}")
+        formats[column] = COPY_FLOAT_FORMATS[column_type]
     
-    return df
+    return formats
 
-def insert_data_to_database(df):
+def build_copy_row_dtype(float_formats):
+    fields = [('field_count', '>i2'), ('timestamp_len', '>i4'), ('timestamp', '>i8')]
+    for column in FLOAT_COLUMNS:
+        fields += [(f'{column}_len', '>i4'), (column, float_formats[column])]
+    return np.dtype(fields)
+
+def build_copy_buffer(data, float_formats):
+    row_dtype = build_copy_row_dtype(float_formats)
+    rows = np.empty(len(data['timestamp']), dtype=row_dtype)
+    rows['field_count'] = 1 + len(FLOAT_COLUMNS)
+    rows['timestamp_len'] = 8
+    rows['timestamp'] = (data['timestamp'] - PG_EPOCH_NS) // 1000
+    
+    for column in FLOAT_COLUMNS:
+        rows[f'{column}_len'] = row_dtype[column].itemsize
+        rows[column] = data[column]
+    
+    buffer = io.BytesIO()
+    buffer.write(b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0))
+    buffer.write(rows.tobytes())
+    buffer.write(struct.pack('>h', -1))
+    buffer.seek(0)
+    
+    return buffer
+
+def insert_data_to_database(data):
     db_config = {
         'host': os.getenv('DB_HOST'),
         'port': os.getenv('DB_PORT'),
@@ -82,31 +140,13 @@ def insert_data_to_database(df):
             print(f"Banco já possui {existing_count} registros. Pulando inserção.")
             return
         
-        data_to_insert = []
-        for _, row in df.iterrows():
-            data_to_insert.append((
-                row['timestamp'],
-                row['wind_speed'],
-                row['power'],
-                row['ambient_temprature']
-            ))
-        
-        batch_size = 1000
-        for i in range(0, len(data_to_insert), batch_size):
-            batch = data_to_insert[i:i + batch_size]
-            
-            cursor.executemany(
-                """
-                INSERT INTO data (timestamp, wind_speed, power, ambient_temprature)
-                VALUES (%s, %s, %s, %s)
-                """,
-                batch
-            )
-            
-            print(f"Inseridos {len(batch)} registros...")
+        cursor.copy_expert(
+            "COPY data (timestamp, wind_speed, power, ambient_temprature) FROM STDIN WITH (FORMAT binary)",
+            build_copy_buffer(data, get_float_formats(cursor))
+        )
         
         conn.commit()
-        print(f"Total de {len(data_to_insert)} registros inseridos com sucesso!")
+        print(f"Total de {len(data['timestamp'])} registros inseridos com sucesso!")
         
         cursor.execute("SELECT COUNT(*) FROM data")
         count = cursor.fetchone()[0]
@@ -134,11 +174,11 @@ def main():
     if not wait_for_database():
         sys.exit(1)
     
-    df = generate_sample_data()
-    print(f"Dados gerados: {len(df)} registros")
-    print(f"Período: {df['timestamp'].min()} a {df['timestamp'].max()}")
+    data = generate_sample_data()
+    print(f"Dados gerados: {len(data['timestamp'])} registros")
+    print(f"Período: {pd.Timestamp(data['timestamp'].min())} a {pd.Timestamp(data['timestamp'].max())}")
     
-    insert_data_to_database(df)
+    insert_data_to_database(data)
     
     print("Processo concluído com sucesso!")
 
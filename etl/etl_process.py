@@ -1,15 +1,19 @@
+import io
 import os
 import sys
+import asyncio
 import httpx
 import pandas as pd
+import pyarrow as pa
 import numpy as np
 from datetime import datetime, timedelta
+from itertools import islice
 import time
 from dotenv import load_dotenv
 import psycopg2
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, make_url, text
 from sqlalchemy.orm import sessionmaker
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, AsyncIterator
 import logging
 
 load_dotenv()
@@ -22,51 +26,154 @@ if missing_vars:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+STREAM_HEADERS = {'Accept': f"{ARROW_STREAM_MEDIA_TYPE}, application/x-ndjson;q=0.9"}
+EXTRACT_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('wind_speed', pa.float32()),
+    ('power', pa.float32())
+])
+EXTRACT_DTYPES = {'wind_speed': 'float32', 'power': 'float32'}
+NDJSON_CHUNK_LINES = 10000
+
+class ChunkReader(io.RawIOBase):
+    # Arquivo somente leitura sobre um iterador de bytes, para o leitor IPC do pyarrow
+    # consumir o corpo da resposta conforme ele chega
+    
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b''
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, None)
+            if self._buffer is None:
+                self._buffer = b''
+                return 0
+        
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+async def _next_chunk(chunks: AsyncIterator):
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+def iterate_from_loop(chunks: AsyncIterator, loop: asyncio.AbstractEventLoop) -> Iterator:
+    # Consome, a partir de uma thread, um iterador assíncrono do event loop: a thread
+    # decodifica enquanto o loop continua livre para as demais transferências
+    while (chunk := asyncio.run_coroutine_threadsafe(_next_chunk(chunks), loop).result()) is not None:
+        yield chunk
+
 class ETLProcessor:
     
     def __init__(self):
         self.api_url = os.getenv('API_URL')
         self.alvo_db_url = os.getenv('ALVO_DATABASE_URL')
         
-        self.alvo_engine = create_engine(self.alvo_db_url)
+        # psycopg 3 para usar pipeline mode na carga; prepare_threshold=None porque o
+        # PgBouncer em modo transaction não suporta prepared statements de sessão
+        self.alvo_engine = create_engine(
+            make_url(self.alvo_db_url).set(drivername='postgresql+psycopg'),
+            connect_args={'prepare_threshold': None}
+        )
         self.alvo_session = sessionmaker(bind=self.alvo_engine)
         
-        self.signal_mapping = {}
+        self.signal_mapping = self.load_signal_mapping()
+    
+    def _extract_params(self, target_date: datetime) -> Dict[str, str]:
+        start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        end_date = start_date + timedelta(days=1)
+        
+        params = {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'variables': 'timestamp,wind_speed,power'
+        }
+        
+        logger.info(f"Extraindo dados para {target_date.date()}...")
+        logger.info(f"URL: {self.api_url}/data/stream")
+        logger.info(f"Parâmetros: {params}")
+        
+        return params
+    
+    def _is_arrow(self, response: httpx.Response) -> bool:
+        return response.headers.get('content-type', '').startswith(ARROW_STREAM_MEDIA_TYPE)
+    
+    def _frame_from_arrow(self, chunks: Iterator[bytes]) -> pd.DataFrame:
+        reader = pa.ipc.open_stream(io.BufferedReader(ChunkReader(chunks)))
+        batches = [batch for batch in reader]
+        return pa.Table.from_batches(batches, schema=reader.schema).cast(EXTRACT_SCHEMA).to_pandas()
+    
+    def _frame_from_ndjson(self, lines: Iterator[str]) -> pd.DataFrame:
+        frames = []
+        while chunk := list(islice(lines, NDJSON_CHUNK_LINES)):
+            frames.append(pd.read_json(
+                io.StringIO('\n'.join(chunk)),
+                lines=True,
+                dtype=EXTRACT_DTYPES,
+                convert_dates=['timestamp']
+            ))
+        
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    
+    def _frame_from_stream(self, arrow: bool, source: Iterator, target_date: datetime) -> pd.DataFrame:
+        df = self._frame_from_arrow(source) if arrow else self._frame_from_ndjson(source)
+        
+        if df.empty:
+            logger.warning(f"Nenhum dado encontrado para {target_date.date()}")
+            return pd.DataFrame()
+        
+        logger.info(f"Extraídos {len(df)} registros")
+        return df
     
     def extract_data(self, target_date: datetime) -> pd.DataFrame:
         try:
-            start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = start_date + timedelta(days=1)
-            
-            start_iso = start_date.isoformat()
-            end_iso = end_date.isoformat()
-            
-            params = {
-                'start_date': start_iso,
-                'end_date': end_iso,
-                'variables': 'timestamp,wind_speed,power'
-            }
-            
-            logger.info(f"Extraindo dados para {target_date.date()}...")
-            logger.info(f"URL: {self.api_url}/data/")
-            logger.info(f"Parâmetros: {params}")
+            params = self._extract_params(target_date)
             
             with httpx.Client(timeout=30.0) as client:
-                response = client.get(f"{self.api_url}/data/", params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if not data.get('data'):
-                    logger.warning(f"Nenhum dado encontrado para {target_date.date()}")
-                    return pd.DataFrame()
-                
-                df = pd.DataFrame(data['data'])
+                with client.stream("GET", f"{self.api_url}/data/stream", params=params, headers=STREAM_HEADERS) as response:
+                    if response.is_error:
+                        response.read()
+                    response.raise_for_status()
+                    
+                    # Lotes Arrow / linhas NDJSON são decodificados conforme chegam
+                    arrow = self._is_arrow(response)
+                    source = response.iter_bytes() if arrow else response.iter_lines()
+                    return self._frame_from_stream(arrow, source, target_date)
                 
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Erro HTTP na API: {e.response.status_code} - {e.response.text}")
+            raise
+        except Exception as e:
+            logger.error(f"Erro na extração: {e}")
+            raise
+    
+    async def extract_data_async(self, client: httpx.AsyncClient, target_date: datetime) -> pd.DataFrame:
+        try:
+            params = self._extract_params(target_date)
+            
+            async with client.stream("GET", f"{self.api_url}/data/stream", params=params, headers=STREAM_HEADERS) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
                 
-                logger.info(f"Extraídos {len(df)} registros")
-                return df
+                # A decodificação (CPU) roda numa thread, lote a lote, puxando os
+                # pedaços do corpo do event loop conforme chegam
+                arrow = self._is_arrow(response)
+                source = response.aiter_bytes() if arrow else response.aiter_lines()
+                return await asyncio.to_thread(
+                    self._frame_from_stream,
+                    arrow,
+                    iterate_from_loop(source, asyncio.get_running_loop()),
+                    target_date
+                )
                 
         except httpx.HTTPStatusError as e:
             logger.error(f"Erro HTTP na API: {e.response.status_code} - {e.response.text}")
@@ -87,29 +194,24 @@ class ETLProcessor:
             
             logger.info("Agregando dados em intervalos de 10 minutos...")
             
-            wind_speed_agg = df['wind_speed'].resample('10T').agg(['mean', 'min', 'max', 'std'])
-            wind_speed_agg.columns = ['wind_speed_mean', 'wind_speed_min', 'wind_speed_max', 'wind_speed_std']
-            
-            power_agg = df['power'].resample('10T').agg(['mean', 'min', 'max', 'std'])
-            power_agg.columns = ['power_mean', 'power_min', 'power_max', 'power_std']
-            
-            aggregated_df = pd.concat([wind_speed_agg, power_agg], axis=1)
-            
-            aggregated_df = aggregated_df.dropna(how='all')
+            bins = df.index.floor('10min')
+            aggregated_df = df[['wind_speed', 'power']].groupby(bins).agg(['mean', 'min', 'max', 'std'])
+            aggregated_df.columns = [f"{column}_{stat}" for column, stat in aggregated_df.columns]
+            aggregated_df = aggregated_df.astype('float32')
+            aggregated_df.index.name = 'timestamp'
             
             logger.info(f"Dados agregados: {len(aggregated_df)} intervalos de 10 minutos")
             
             logger.info("Transformando para formato longo...")
             
-            aggregated_df = aggregated_df.reset_index()
-            
-            long_df = aggregated_df.melt(
-                id_vars=['timestamp'],
-                var_name='signal_name',
-                value_name='value'
-            )
+            n_signals = len(aggregated_df.columns)
+            long_df = pd.DataFrame({
+                'timestamp': np.repeat(aggregated_df.index.values, n_signals),
+                'signal_name': np.tile(aggregated_df.columns.values, len(aggregated_df)),
+                'value': aggregated_df.to_numpy().ravel()
+            })
             
-            long_df = long_df.dropna()
+            long_df = long_df.dropna(subset=['value'])
             
             logger.info(f"Transformação concluída: {len(long_df)} registros")
             return long_df
@@ -137,30 +239,42 @@ class ETLProcessor:
         try:
             logger.info("Iniciando carga dos dados...")
             
-            if not self.signal_mapping:
-                self.signal_mapping = self.load_signal_mapping()
-            
-            df['signal_id'] = df['signal_name'].map(self.signal_mapping)
+            names = df['signal_name'].to_numpy()
+            signal_ids = np.fromiter(
+                (self.signal_mapping.get(name, -1) for name in names),
+                dtype=np.int64,
+                count=len(names)
+            )
             
-            unmapped_signals = df[df['signal_id'].isna()]['signal_name'].unique()
-            if len(unmapped_signals) > 0:
-                logger.warning(f"Sinais não mapeados: {unmapped_signals}")
-                df = df.dropna(subset=['signal_id'])
+            mapped = signal_ids >= 0
+            if not mapped.all():
+                logger.warning(f"Sinais não mapeados: {np.unique(names[~mapped])}")
+                df = df.loc[mapped]
+                signal_ids = signal_ids[mapped]
             
             if df.empty:
                 logger.warning("Nenhum dado válido para inserir após mapeamento")
                 return 0
             
-            df_to_insert = df[['timestamp', 'signal_id', 'value']].copy()
+            rows = list(zip(
+                df['timestamp'].dt.to_pydatetime(),
+                signal_ids.tolist(),
+                df['value'].astype('float64').tolist()
+            ))
             
-            rows_inserted = df_to_insert.to_sql(
-                'data',
-                self.alvo_engine,
-                if_exists='append',
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
+            conn = self.alvo_engine.raw_connection()
+            try:
+                with conn.cursor() as cursor:
+                    with conn.driver_connection.pipeline():
+                        cursor.executemany(
+                            "INSERT INTO data (timestamp, signal_id, value) VALUES (%s, %s, %s) "
+                            "ON CONFLICT (timestamp, signal_id) DO NOTHING",
+                            rows
+                        )
+                    rows_inserted = cursor.rowcount
+                conn.commit()
+            finally:
+                conn.close()
             
             logger.info(f"Carga concluída: {rows_inserted} registros inseridos")
             return rows_inserted
@@ -169,41 +283,59 @@ class ETLProcessor:
             logger.error(f"Erro na carga: {e}")
             raise
     
+    def _transform_and_load(self, target_date: datetime, raw_data: pd.DataFrame) -> Dict[str, Any]:
+        if raw_data.empty:
+            return {
+                'date': target_date.date(),
+                'status': 'no_data',
+                'records_processed': 0,
+                'records_inserted': 0
+            }
+        
+        transformed_data = self.transform_data(raw_data)
+        
+        records_inserted = self.load_data(transformed_data)
+        
+        return {
+            'date': target_date.date(),
+            'status': 'success',
+            'records_processed': len(raw_data),
+            'records_inserted': records_inserted,
+            'intervals_processed': len(transformed_data) // 8
+        }
+    
+    def _error_result(self, target_date: datetime, error: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro no processamento para {target_date.date()}: {error}")
+        return {
+            'date': target_date.date(),
+            'status': 'error',
+            'error': str(error),
+            'records_processed': 0,
+            'records_inserted': 0
+        }
+    
     def process_date(self, target_date: datetime) -> Dict[str, Any]:
         logger.info(f"Iniciando ETL para {target_date.date()}")
         
         try:
             raw_data = self.extract_data(target_date)
-            
-            if raw_data.empty:
-                return {
-                    'date': target_date.date(),
-                    'status': 'no_data',
-                    'records_processed': 0,
-                    'records_inserted': 0
-                }
-            
-            transformed_data = self.transform_data(raw_data)
-            
-            records_inserted = self.load_data(transformed_data)
-            
-            return {
-                'date': target_date.date(),
-                'status': 'success',
-                'records_processed': len(raw_data),
-                'records_inserted': records_inserted,
-                'intervals_processed': len(transformed_data) // 8
-            }
-            
+            return self._transform_and_load(target_date, raw_data)
         except Exception as e:
-            logger.error(f"Erro no processamento para {target_date.date()}: {e}")
-            return {
-                'date': target_date.date(),
-                'status': 'error',
-                'error': str(e),
-                'records_processed': 0,
-                'records_inserted': 0
-            }
+            return self._error_result(target_date, e)
+    
+    async def _process_date_async(self, client: httpx.AsyncClient, target_date: datetime) -> Dict[str, Any]:
+        logger.info(f"Iniciando ETL para {target_date.date()}")
+        
+        try:
+            raw_data = await self.extract_data_async(client, target_date)
+            return await asyncio.to_thread(self._transform_and_load, target_date, raw_data)
+        except Exception as e:
+            return self._error_result(target_date, e)
+    
+    async def process_dates(self, dates: List[datetime], max_connections: int = 16) -> List[Dict[str, Any]]:
+        limits = httpx.Limits(max_connections=max_connections)
+        async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+            return await asyncio.gather(*(self._process_date_async(client, d) for d in dates))
 
 def main():
     import argparse
@@ -2,21 +2,58 @@
 
 import os
 import sys
-from datetime import datetime
+import asyncio
+import argparse
+from datetime import datetime, timedelta
 from etl_process import ETLProcessor
 from prepare_alvo_db import main as prepare_db
 
+def parse_dates(args):
+    if args.date:
+        return [datetime.strptime(args.date, '%Y-%m-%d')]
+    
+    start_date = datetime.strptime(args.start, '%Y-%m-%d')
+    end_date = datetime.strptime(args.end, '%Y-%m-%d')
+    
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+def print_result(result):
+    print(f"\n=== Resultado do ETL ===")
+    print(f"Data: {result['date']}")
+    print(f"Status: {result['status']}")
+    
+    if result['status'] == 'success':
+        print(f"Registros processados: {result['records_processed']}")
+        print(f"Registros inseridos: {result['records_inserted']}")
+        print(f"Intervalos processados: {result['intervals_processed']}")
+    elif result['status'] == 'no_data':
+        print("Nenhum dado encontrado para a data especificada")
+    elif result['status'] == 'error':
+        print(f"Erro: {result['error']}")
+
 def main():
     print("=== Pipeline de ETL Delfos ===")
     
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description='Pipeline de ETL Delfos')
+    parser.add_argument('date', nargs='?', help='Data para processar (YYYY-MM-DD)')
+    parser.add_argument('--start', type=str, help='Data inicial do backfill (YYYY-MM-DD)')
+    parser.add_argument('--end', type=str, help='Data final do backfill, inclusiva (YYYY-MM-DD)')
+    
+    args = parser.parse_args()
+    
+    if not args.date and not (args.start and args.end):
         print("Uso: python main.py YYYY-MM-DD")
+        print("     python main.py --start YYYY-MM-DD --end YYYY-MM-DD")
         print("Exemplo: python main.py 2024-01-01")
         sys.exit(1)
     
     try:
-        target_date = datetime.strptime(sys.argv[1], '%Y-%m-%d')
-        print(f"Processando dados para: {target_date.date()}")
+        dates = parse_dates(args)
+        if not dates:
+            print("Erro: --end deve ser igual ou posterior a --start")
+            sys.exit(1)
+        
+        print(f"Processando dados para: {dates[0].date()}" + (f" a {dates[-1].date()}" if len(dates) > 1 else ""))
         
         print("\n1. Preparando banco de dados alvo...")
         prepare_db()
@@ -24,23 +61,19 @@ def main():
         print("\n2. Iniciando processamento ETL...")
         processor = ETLProcessor()
         
-        result = processor.process_date(target_date)
-        
-        print(f"\n=== Resultado do ETL ===")
-        print(f"Data: {result['date']}")
-        print(f"Status: {result['status']}")
-        
-        if result['status'] == 'success':
-            print(f"Registros processados: {result['records_processed']}")
-            print(f"Registros inseridos: {result['records_inserted']}")
-            print(f"Intervalos processados: {result['intervals_processed']}")
-            print("\nETL executado com sucesso!")
-        elif result['status'] == 'no_data':
-            print("Nenhum dado encontrado para a data especificada")
-        elif result['status'] == 'error':
-            print(f"Erro: {result['error']}")
+        if len(dates) == 1:
+            results = [processor.process_date(dates[0])]
+        else:
+            results = asyncio.run(processor.process_dates(dates))
+        
+        for result in results:
+            print_result(result)
+        
+        if any(result['status'] == 'error' for result in results):
             sys.exit(1)
         
+        print("\nETL executado com sucesso!")
+        
     except ValueError:
         print("Erro: Formato de data inválido. Use YYYY-MM-DD")
         sys.exit(1)
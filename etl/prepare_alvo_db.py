@@ -2,7 +2,7 @@
 
 import os
 import sys
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import create_engine, text, Column, Integer, String, REAL, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -28,11 +28,14 @@ class Signal(Base):
 
 class Data(Base):
     __tablename__ = "data"
+    __table_args__ = (
+        UniqueConstraint('timestamp', 'signal_id', name='uq_data_ts_signal'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, nullable=False, index=True)
     signal_id = Column(Integer, ForeignKey("signal.id"), nullable=False, index=True)
-    value = Column(Float, nullable=False)
+    value = Column(REAL, nullable=False)
     
     signal = relationship("Signal", back_populates="data_records")
 
@@ -44,6 +47,29 @@ def create_tables():
         print(f"Erro ao criar tabelas: {e}")
         sys.exit(1)
 
+# Copiado para junto deste arquivo na imagem; fora dela, lido de database/
+DATA_MIGRATION_FILE = 'migrate_alvo_data.sql'
+
+def load_data_migration():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in (
+        os.path.join(base_dir, DATA_MIGRATION_FILE),
+        os.path.join(base_dir, '..', 'database', DATA_MIGRATION_FILE)
+    ):
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return text(f.read())
+    raise FileNotFoundError(f"{DATA_MIGRATION_FILE} não encontrado")
+
+def migrate_data_table():
+    try:
+        with engine.begin() as conn:
+            conn.execute(load_data_migration())
+        print("Migração da tabela data aplicada com sucesso!")
+    except Exception as e:
+        print(f"Erro ao migrar tabela data: {e}")
+        sys.exit(1)
+
 def insert_initial_signals():
     db = SessionLocal()
     
@@ -111,6 +137,8 @@ def main():
     
     create_tables()
     
+    migrate_data_table()
+    
     insert_initial_signals()
     
     verify_database()
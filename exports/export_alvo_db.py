@@ -2,9 +2,23 @@
 
 import psycopg2
 import pandas as pd
+import pyarrow as pa
 from datetime import datetime
 import os
 
+from parquet_export import stream_query_to_parquet
+
+EXPORT_BATCH_SIZE = 50000
+
+DATA_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('timestamp', pa.timestamp('us')),
+    ('signal_id', pa.int64()),
+    ('value', pa.float32()),
+    ('signal_name', pa.string()),
+    ('signal_description', pa.string())
+])
+
 def connect_to_alvo_db():
     try:
         conn = psycopg2.connect(
@@ -19,7 +33,24 @@ def connect_to_alvo_db():
         print(f"Erro ao conectar ao banco alvo: {e}")
         return None
 
-def export_alvo_data():
+def attach_signal_columns(data_df, signal_df):
+    signals = signal_df.set_index('id')
+    data_df['signal_name'] = data_df['signal_id'].map(signals['name'])
+    data_df['signal_description'] = data_df['signal_id'].map(signals['description'])
+    return data_df
+
+def signal_columns_transform(signal_df):
+    names = dict(zip(signal_df['id'], signal_df['name']))
+    descriptions = dict(zip(signal_df['id'], signal_df['description']))
+    
+    def transform(columns):
+        columns['signal_name'] = [names.get(signal_id) for signal_id in columns['signal_id']]
+        columns['signal_description'] = [descriptions.get(signal_id) for signal_id in columns['signal_id']]
+        return columns
+    
+    return transform
+
+def export_alvo_data(excel=False):
     print("CONECTANDO AO BANCO ALVO...")
     
     conn = connect_to_alvo_db()
@@ -39,37 +70,49 @@ def export_alvo_data():
         
         print("  Exportando tabela 'data'...")
         data_query = """
-            SELECT 
-                d.id,
-                d.timestamp,
-                d.signal_id,
-                d.value,
-                s.name as signal_name,
-                s.description as signal_description
-            FROM data d
-            JOIN signal s ON d.signal_id = s.id
-            ORDER BY d.timestamp DESC, d.signal_id
+            SELECT id, timestamp, signal_id, value
+            FROM data
+            ORDER BY timestamp DESC, signal_id
         """
-        data_df = pd.read_sql_query(data_query, conn)
-        
-        print(f"Total de sinais: {len(signal_df)}")
-        print(f"Total de registros de dados: {len(data_df):,}")
-        print(f"Período dos dados: {data_df['timestamp'].min()} a {data_df['timestamp'].max()}")
         
         timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{export_dir}/alvo_db_data_{timestamp_str}.xlsx"
-        
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            signal_df.to_excel(writer, sheet_name='Tabela_Signal', index=False)
+        if excel:
+            data_df = attach_signal_columns(pd.read_sql_query(data_query, conn), signal_df)
             
-            data_df.to_excel(writer, sheet_name='Tabela_Data', index=False)
-        
-        print(f"Dados exportados com sucesso para: {filename}")
-        print(f"Arquivo salvo em: {os.path.abspath(filename)}")
-        
-        print("\nABAS CRIADAS NO EXCEL:")
-        print("  Tabela_Signal: Definição dos sinais")
-        print("  Tabela_Data: Todos os dados processados")
+            print(f"Total de sinais: {len(signal_df)}")
+            print(f"Total de registros de dados: {len(data_df):,}")
+            print(f"Período dos dados: {data_df['timestamp'].min()} a {data_df['timestamp'].max()}")
+            
+            filename = f"{export_dir}/alvo_db_data_{timestamp_str}.xlsx"
+            
+            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+                signal_df.to_excel(writer, sheet_name='Tabela_Signal', index=False)
+                
+                data_df.to_excel(writer, sheet_name='Tabela_Data', index=False)
+            
+            print(f"Dados exportados com sucesso para: {filename}")
+            print(f"Arquivo salvo em: {os.path.abspath(filename)}")
+            
+            print("\nABAS CRIADAS NO EXCEL:")
+            print("  Tabela_Signal: Definição dos sinais")
+            print("  Tabela_Data: Todos os dados processados")
+        else:
+            signal_filename = f"{export_dir}/alvo_db_signal_{timestamp_str}.parquet"
+            signal_df.to_parquet(signal_filename, engine='pyarrow', index=False)
+            
+            filename = f"{export_dir}/alvo_db_data_{timestamp_str}.parquet"
+            total_records, max_timestamp, min_timestamp = stream_query_to_parquet(
+                conn, data_query, filename, DATA_SCHEMA, EXPORT_BATCH_SIZE,
+                transform=signal_columns_transform(signal_df)
+            )
+            
+            print(f"Total de sinais: {len(signal_df)}")
+            print(f"Total de registros de dados: {total_records:,}")
+            print(f"Período dos dados: {min_timestamp} a {max_timestamp}")
+            
+            print(f"Dados exportados com sucesso para: {filename}")
+            print(f"Sinais exportados para: {signal_filename}")
+            print(f"Arquivos salvos em: {os.path.abspath(export_dir)}")
         
         return filename
         
@@ -81,17 +124,25 @@ def export_alvo_data():
         conn.close()
 
 def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Exportação do banco de dados alvo')
+    parser.add_argument('--excel', action='store_true', help='Exportar em Excel (.xlsx) em vez de Parquet')
+    
+    args = parser.parse_args()
+    
     print("EXPORTAÇÃO DO BANCO DE DADOS ALVO")
     print("=" * 50)
     
-    filename = export_alvo_data()
+    filename = export_alvo_data(excel=args.excel)
     
     if filename:
         print("\n" + "=" * 50)
         print("EXPORTAÇÃO CONCLUÍDA COM SUCESSO!")
         print("=" * 50)
         print(f"Arquivo: {filename}")
-        print(f"Abra o arquivo Excel para visualizar os dados")
+        if args.excel:
+            print("Abra o arquivo Excel para visualizar os dados")
     else:
         print("\n" + "=" * 50)
         print("EXPORTAÇÃO FALHOU!")
@@ -2,9 +2,21 @@
 
 import psycopg2
 import pandas as pd
+import pyarrow as pa
 from datetime import datetime
 import os
 
+from parquet_export import stream_query_to_parquet
+
+EXPORT_BATCH_SIZE = 100000
+
+DATA_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('wind_speed', pa.float32()),
+    ('power', pa.float32()),
+    ('ambient_temprature', pa.float32())
+])
+
 def connect_to_fonte_db():
     try:
         conn = psycopg2.connect(
@@ -19,7 +31,7 @@ def connect_to_fonte_db():
         print(f"Erro ao conectar ao banco fonte: {e}")
         return None
 
-def export_fonte_data():
+def export_fonte_data(excel=False):
     print("CONECTANDO AO BANCO FONTE...")
     
     conn = connect_to_fonte_db()
@@ -43,15 +55,23 @@ def export_fonte_data():
             ORDER BY timestamp
         """
         
-        df = pd.read_sql_query(query, conn)
-        
-        print(f"Total de registros encontrados: {len(df):,}")
-        print(f"Período: {df['timestamp'].min()} a {df['timestamp'].max()}")
-        
         timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{export_dir}/fonte_db_data_{timestamp_str}.xlsx"
-        
-        df.to_excel(filename, sheet_name='Dados_Completos', index=False)
+        if excel:
+            df = pd.read_sql_query(query, conn)
+            
+            print(f"Total de registros encontrados: {len(df):,}")
+            print(f"Período: {df['timestamp'].min()} a {df['timestamp'].max()}")
+            
+            filename = f"{export_dir}/fonte_db_data_{timestamp_str}.xlsx"
+            df.to_excel(filename, sheet_name='Dados_Completos', index=False)
+        else:
+            filename = f"{export_dir}/fonte_db_data_{timestamp_str}.parquet"
+            total_records, min_timestamp, max_timestamp = stream_query_to_parquet(
+                conn, query, filename, DATA_SCHEMA, EXPORT_BATCH_SIZE
+            )
+            
+            print(f"Total de registros encontrados: {total_records:,}")
+            print(f"Período: {min_timestamp} a {max_timestamp}")
         
         print(f"Dados exportados com sucesso para: {filename}")
         print(f"Arquivo salvo em: {os.path.abspath(filename)}")
@@ -66,17 +86,25 @@ def export_fonte_data():
         conn.close()
 
 def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Exportação do banco de dados fonte')
+    parser.add_argument('--excel', action='store_true', help='Exportar em Excel (.xlsx) em vez de Parquet')
+    
+    args = parser.parse_args()
+    
     print("EXPORTAÇÃO DO BANCO DE DADOS FONTE")
     print("=" * 50)
     
-    filename = export_fonte_data()
+    filename = export_fonte_data(excel=args.excel)
     
     if filename:
         print("\n" + "=" * 50)
         print("EXPORTAÇÃO CONCLUÍDA COM SUCESSO!")
         print("=" * 50)
         print(f"Arquivo: {filename}")
-        print(f"Abra o arquivo Excel para visualizar os dados")
+        if args.excel:
+            print("Abra o arquivo Excel para visualizar os dados")
     else:
         print("\n" + "=" * 50)
         print("EXPORTAÇÃO FALHOU!")
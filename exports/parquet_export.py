@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+def stream_query_to_parquet(conn, query, filename, schema, batch_size, transform=None):
+    total_records = 0
+    first_timestamp = last_timestamp = None
+    writer = pq.ParquetWriter(filename, schema, compression='zstd')
+    cursor = conn.cursor(name='export_cur')
+    cursor.itersize = batch_size
+    
+    try:
+        cursor.execute(query)
+        
+        while batch := cursor.fetchmany(batch_size):
+            # transform recebe e devolve {coluna: valores}; colunas extras entram pelo schema
+            columns = dict(zip([column.name for column in cursor.description], zip(*batch)))
+            if transform is not None:
+                columns = transform(columns)
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(columns[field.name], type=field.type) for field in schema],
+                schema=schema
+            ))
+            
+            if first_timestamp is None:
+                first_timestamp = columns['timestamp'][0]
+            last_timestamp = columns['timestamp'][-1]
+            total_records += len(batch)
+            print(f"  {total_records:,} registros exportados...")
+    finally:
+        cursor.close()
+        writer.close()
+    
+    return total_records, first_timestamp, last_timestamp